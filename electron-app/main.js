@@ -99,13 +99,22 @@ ipcMain.on('start-monitoring', () => {
     [path.join(__dirname, '..', 'python-scripts', 'charger_api.py'), '--monitor'] // Python script path with --monitor flag
   );
 
-  // Listen to stdout for real-time updates
+  // Listen to stdout for real-time updates (one JSON message per line; a chunk
+  // may hold several messages or end mid-line)
+  let stdoutBuffer = '';
   pythonProcess.stdout.on('data', (data) => {
-    try {
-      const message = JSON.parse(data.toString());
-      mainWindow.webContents.send('charger-data', message);
-    } catch (err) {
-      console.error('Failed to parse Python stdout:', err);
+    stdoutBuffer += data.toString();
+    const lines = stdoutBuffer.split('\n');
+    stdoutBuffer = lines.pop();
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      try {
+        const message = JSON.parse(line);
+        mainWindow.webContents.send('charger-data', message);
+      } catch (err) {
+        console.error('Failed to parse Python stdout:', err);
+      }
     }
   });
 
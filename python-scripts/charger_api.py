@@ -7,20 +7,31 @@ warnings.filterwarnings("ignore", category=CryptographyDeprecationWarning)
 
 import os
 
-from scapy.layers.l2 import ARP, Ether
-from scapy.sendrecv import srp
-
+import atexit
+import ipaddress
+import select
 import socket
+import struct
 import logging
+from logging.handlers import RotatingFileHandler
 import requests
 import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import json
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import time
 import random
 import string
 import sys
 
+# orjson is considerably faster than the stdlib json module; fall back if it's not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Determine the absolute path to the logs directory
 script_dir = os.path.dirname(os.path.abspath(__file__))
 log_dir = os.path.join(script_dir, '..', 'logs')
@@ -31,16 +42,28 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 # Create the logs directory if it doesn't exist
 os.makedirs(log_dir, exist_ok=True)
 
-# Define the log file path
+# Define the log file paths. The long-running monitor logs to its own file so it can be
+# rotated: RotatingFileHandler can't share a file with the one-shot process spawned on refresh
 log_file = os.path.join(log_dir, 'charger_api.log')
+monitor_log_file = os.path.join(log_dir, 'charger_api_monitor.log')
 
-# Logging setup
-logging.basicConfig(
-    filename=log_file,
-    level=logging.INFO,
-    format='%(asctime)s %(levelname)s %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+log = logging.getLogger(__name__)
+
+def configure_logging(monitor):
+    """
+    Sets up file logging for the selected mode; only the monitor's log is rotated.
+    """
+    if monitor:
+        handler = RotatingFileHandler(monitor_log_file, maxBytes=5 * 1024 * 1024, backupCount=3)
+    else:
+        handler = logging.FileHandler(log_file)
+
+    logging.basicConfig(
+        handlers=[handler],
+        level=logging.INFO,
+        format='%(asctime)s %(levelname)s %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
 
 
 # Configuration
@@ -50,11 +73,69 @@ PASSWORD = 'E2'              # Password for login
 API_LOGIN_ENDPOINT = '/api/login.php'
 API_GET_ENDPOINT = '/api/get.php'
 
-# Update RAY_MAC_PREFIX based on actual Ray device MAC addresses
-RAY_MAC_PREFIX = '02:df:9a'  # Example prefix; update as necessary
+# Headers sent with every charger API request
+API_HEADERS = {
+    'Content-Type': 'application/json',
+    'User-Agent': 'Python-Requests'
+}
+
+# Login request body, serialized once since it never changes
+LOGIN_BODY = json.dumps({
+    "version": 1,
+    "login": {
+        "username": USERNAME,
+        "password": PASSWORD
+    }
+}).encode('utf-8')
+
+# Update RAY_MAC_PREFIXES based on actual Ray device MAC addresses (lowercase OUI prefixes)
+RAY_MAC_PREFIXES = ('02:df:9a',)  # Example prefix; add more as necessary
+
+# Hostname prefixes for Ray devices
+RAY_HOSTNAME_PREFIXES = ('ray-',)
+
+# Interval (seconds) between scans in monitor mode; adjust as needed
+MONITOR_INTERVAL = 3
+
+# How long (seconds) to wait for ARP replies during a network scan
+ARP_SCAN_TIMEOUT = 3
+
+# How long (seconds) a network scan result is reused before scanning again
+ARP_CACHE_TTL = 30
+
+# Connection pool size for each charger's persistent HTTPS session
+SESSION_POOL_SIZE = 4
+
+# Maximum number of Ray units polled concurrently
+MAX_POLL_WORKERS = 16
+
+# Timeouts (seconds) for each charger API request: (connect, read)
+REQUEST_TIMEOUT = (2, 5)
+
+# Retry policy for charger API requests; one quick retry sheds transient failures
+# without letting an unreachable charger stall its poll
+REQUEST_RETRY = Retry(
+    total=1,
+    backoff_factor=0.1,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=('GET', 'POST'),
+    raise_on_status=False
+)
+
+# How long (seconds) a charger login token is reused before logging in again
+TOKEN_TTL = 600
+
+# Number of monitor ticks after which all charger statuses are resent, even if unchanged
+FULL_RESEND_TICKS = 10
+
+# HTTP statuses with which a charger rejects an expired or invalid token
+AUTH_ERROR_STATUSES = (401, 403)
 
-# Hostname prefix for Ray devices
-RAY_HOSTNAME_PREFIX = 'ray-'
+# How long (seconds) resolved hostnames are cached between scans
+HOSTNAME_CACHE_TTL = 900
+
+# Maximum number of concurrent reverse DNS lookups during a scan
+MAX_RESOLVE_WORKERS = 8
 
 # List of known Ray Devices (Manually Specified)
 KNOWN_RAY_DEVICES = [
@@ -65,180 +146,415 @@ KNOWN_RAY_DEVICES = [
     # Add more known devices here if needed
 ]
 
-def find_ray_units():
+# Persistent HTTPS sessions keyed by charger IP, reused across scan cycles
+_SESSIONS = {}
+_SESSIONS_LOCK = threading.Lock()
+
+def get_session(ip_address):
     """
-    Scans the network to find Ray charger units based on MAC address prefix and hostname patterns.
-    Returns a list of Ray units.
+    Returns the persistent session for the given charger IP, creating it on first use.
+    Keeping one session per host reuses the keep-alive connection (and skips the TLS
+    handshake) on every scan while keeping cookies isolated between chargers.
+    """
+    with _SESSIONS_LOCK:
+        session = _SESSIONS.get(ip_address)
+        if session is None:
+            session = requests.Session()
+            session.verify = False  # Suppress SSL warnings
+            session.headers.update(API_HEADERS)
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=SESSION_POOL_SIZE, max_retries=REQUEST_RETRY)
+            session.mount('https://', adapter)
+            _SESSIONS[ip_address] = session
+        return session
+
+def close_sessions():
+    """
+    Closes all persistent charger sessions. Registered to run at interpreter exit.
+    """
+    with _SESSIONS_LOCK:
+        for session in _SESSIONS.values():
+            session.close()
+        _SESSIONS.clear()
+
+atexit.register(close_sessions)
+
+# Reverse DNS results keyed by IP: (lookup time, hostname or None)
+_HOSTNAME_CACHE = {}
+
+def resolve_hostname(ip_address, ttl=HOSTNAME_CACHE_TTL):
+    """
+    Resolves the hostname for an IP address, caching the result (including misses)
+    for ttl seconds so repeated scans skip the blocking reverse DNS lookup.
+    """
+    now = time.monotonic()
+    cached = _HOSTNAME_CACHE.get(ip_address)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+
+    try:
+        # Attempt to resolve hostname
+        hostname = socket.gethostbyaddr(ip_address)[0]
+        log.debug("Resolved hostname %s for IP %s", hostname, ip_address)
+    except (socket.herror, socket.gaierror):
+        hostname = None
+        log.debug("Could not resolve hostname for IP %s", ip_address)
+
+    _HOSTNAME_CACHE[ip_address] = (now, hostname)
+    return hostname
+
+# Binary stdout, bound once; monitor messages are already encoded and skip the text layer
+STDOUT = sys.stdout.buffer
+
+def loads_json(content):
+    """
+    Parses a JSON document from bytes or str, using orjson when available.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def dumps_json(obj):
+    """
+    Serializes an object to compact JSON bytes, using orjson when available.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def emit_messages(messages):
+    """
+    Writes JSON messages to stdout for the Electron app, one per line,
+    using a single write and flush for the whole batch.
+    """
+    if not messages:
+        return
+    STDOUT.write(b"\n".join(map(dumps_json, messages)) + b"\n")
+    STDOUT.flush()
+
+ETH_P_ARP = 0x0806
+SIOCGIFADDR = 0x8915
+
+def get_scan_interface(network):
+    """
+    Finds the local interface attached to the given network (Linux only).
+    Returns (interface name, MAC bytes, IPv4 bytes), or None if no interface matches.
+    """
+    import fcntl
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for _, ifname in socket.if_nameindex():
+            try:
+                ifreq = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, struct.pack('256s', ifname[:15].encode()))
+            except OSError:
+                continue
+            ip_bytes = ifreq[20:24]
+            if ipaddress.IPv4Address(ip_bytes) not in network:
+                continue
+            try:
+                with open(f"/sys/class/net/{ifname}/address") as f:
+                    mac_bytes = bytes.fromhex(f.read().strip().replace(':', ''))
+            except (OSError, ValueError):
+                continue
+            return ifname, mac_bytes, ip_bytes
+    return None
+
+def arp_scan_raw(network, interface):
     """
-    logging.info(f"Scanning the network for devices in range {IP_RANGE}...")
+    ARP-scans the network with a raw AF_PACKET socket, patching only the target IP
+    into a prebuilt request frame for each host.
+    Returns a list of (ip, mac) tuples for the devices that replied.
+    """
+    ifname, src_mac, src_ip = interface
+
+    # Ethernet broadcast header + ARP request (target IP at offset 38), padded to the minimum frame size
+    template = (
+        b"\xff" * 6 + src_mac + struct.pack('!H', ETH_P_ARP)
+        + struct.pack('!HHBBH', 1, 0x0800, 6, 4, 1) + src_mac + src_ip
+        + b"\x00" * 6 + b"\x00" * 4
+    ).ljust(60, b"\x00")
+    prefix, suffix = template[:38], template[42:]
+
+    responders = {}
+    with socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP)) as sock:
+        sock.bind((ifname, 0))
+
+        for host in network.hosts():
+            sock.send(prefix + host.packed + suffix)
+
+        deadline = time.monotonic() + ARP_SCAN_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            readable, _, _ = select.select([sock], [], [], remaining)
+            if not readable:
+                break
+            frame = sock.recv(65535)
+            if len(frame) < 42:
+                continue
+            opcode, = struct.unpack_from('!H', frame, 20)
+            if opcode != 2:  # Only ARP replies
+                continue
+            sender_ip = ipaddress.IPv4Address(frame[28:32])
+            if sender_ip in network:
+                responders[str(sender_ip)] = frame[22:28].hex(':')
+
+    return list(responders.items())
+
+def arp_scan_scapy(ip_range):
+    """
+    ARP-scans the network using scapy, for platforms without AF_PACKET sockets.
+    Returns a list of (ip, mac) tuples for the devices that replied.
+    """
+    # Imported lazily: scapy is slow to import and only needed when the raw socket scan isn't available
+    from scapy.layers.l2 import ARP, Ether
+    from scapy.sendrecv import srp
 
     # Create an ARP packet
-    arp = ARP(pdst=IP_RANGE)
+    arp = ARP(pdst=ip_range)
     # Create an Ethernet broadcast packet
     ether = Ether(dst="ff:ff:ff:ff:ff:ff")
     # Stack them
     packet = ether / arp
 
+    # Send the packet and receive responses
+    result = srp(packet, timeout=ARP_SCAN_TIMEOUT, verbose=0)[0]
+    return [(received.psrc, received.hwsrc.lower()) for sent, received in result]
+
+# Result of the last successful network scan, reused for ARP_CACHE_TTL seconds
+_ARP_CACHE = {'ts': 0.0, 'units': []}
+
+def invalidate_arp_cache():
+    """
+    Forces the next find_ray_units call to rescan the network.
+    """
+    _ARP_CACHE['ts'] = 0.0
+
+def find_ray_units():
+    """
+    Scans the network to find Ray charger units based on MAC address prefix and hostname patterns.
+    The result of the last scan is reused for ARP_CACHE_TTL seconds, since the set of
+    devices on the network rarely changes between monitor ticks.
+    Returns a list of Ray units.
+    """
+    if _ARP_CACHE['ts'] and time.monotonic() - _ARP_CACHE['ts'] < ARP_CACHE_TTL:
+        return list(_ARP_CACHE['units'])
+
+    log.debug("Scanning the network for devices in range %s...", IP_RANGE)
+
     try:
-        # Send the packet and receive responses
-        result = srp(packet, timeout=3, verbose=0)[0]
+        network = ipaddress.IPv4Network(IP_RANGE, strict=False)
+        interface = get_scan_interface(network) if hasattr(socket, 'AF_PACKET') else None
+        if interface:
+            responders = arp_scan_raw(network, interface)
+        else:
+            responders = arp_scan_scapy(IP_RANGE)
     except PermissionError:
-        logging.error("Permission denied: You need to run this script as an administrator/root.")
+        log.error("Permission denied: You need to run this script as an administrator/root.")
         return []
     except Exception as e:
-        logging.error(f"Error during ARP scan: {e}")
+        log.error("Error during ARP scan: %s", e)
         return []
 
     ray_units = []
 
-    for sent, received in result:
-        ip_address = received.psrc
-        mac_address = received.hwsrc.lower()
+    # Resolve hostnames concurrently; cached entries return without touching the resolver
+    with ThreadPoolExecutor(max_workers=MAX_RESOLVE_WORKERS) as executor:
+        hostnames = list(executor.map(resolve_hostname, [ip for ip, mac in responders]))
 
-        try:
-            # Attempt to resolve hostname
-            hostname = socket.gethostbyaddr(ip_address)[0]
-            logging.debug(f"Resolved hostname {hostname} for IP {ip_address}")
-        except socket.herror:
-            hostname = None
-            logging.debug(f"Could not resolve hostname for IP {ip_address}")
-
-        # Identify Ray devices by MAC prefix or hostname
-        if mac_address.startswith(RAY_MAC_PREFIX) or (hostname and hostname.startswith(RAY_HOSTNAME_PREFIX)):
-            logging.info(f"Found Ray device at IP: {ip_address}, MAC: {mac_address}, Hostname: {hostname or 'Unknown'}")
+    for (ip_address, mac_address), hostname in zip(responders, hostnames):
+        # Identify Ray devices by MAC prefix or hostname (startswith checks every prefix in one call)
+        if mac_address.startswith(RAY_MAC_PREFIXES) or (hostname and hostname.startswith(RAY_HOSTNAME_PREFIXES)):
+            log.debug("Found Ray device at IP: %s, MAC: %s, Hostname: %s", ip_address, mac_address, hostname or 'Unknown')
             ray_units.append({
                 "ip": ip_address,
                 "hostname": hostname or "Unknown"
             })
         else:
-            logging.debug(f"Device at IP {ip_address} with MAC {mac_address} does not match Ray device criteria")
+            log.debug("Device at IP %s with MAC %s does not match Ray device criteria", ip_address, mac_address)
 
     if not ray_units:
-        logging.warning("No Ray devices found via network scan.")
+        log.warning("No Ray devices found via network scan.")
     else:
-        logging.info(f"Ray units found: {ray_units}")
+        log.debug("Ray units found: %s", ray_units)
+
+    _ARP_CACHE['ts'] = time.monotonic()
+    _ARP_CACHE['units'] = ray_units
+    return list(ray_units)
 
-    return ray_units
+# Per-charger polling state keyed by IP: cached login token and last reported info
+_UNIT_STATE = {}
 
 def check_unit_ready(units):
     """
     Checks if all provided Ray units are ready by interacting with their APIs.
+    Units are polled concurrently since each check is bound by network I/O.
     Returns a list of device_info dictionaries.
     """
-    logging.info("Starting API interaction to check unit readiness...")
+    log.debug("Starting API interaction to check unit readiness...")
+
+    if not units:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(MAX_POLL_WORKERS, len(units))) as executor:
+        devices_info = [device_info for device_info in executor.map(poll_unit, units) if device_info]
+
+    return devices_info
+
+def get_unit_state(ip_address):
+    """
+    Returns the cached polling state (login token and last reported info) for a charger.
+    """
+    return _UNIT_STATE.setdefault(ip_address, {'token': None, 'token_ts': 0.0, 'last_info': None})
 
-    devices_info = []
+def reset_unit_state(ip_address):
+    """
+    Discards the cached polling state for a charger, e.g. once it leaves the network.
+    """
+    _UNIT_STATE.pop(ip_address, None)
 
-    for unit in units:
-        ip_address = unit['ip']
-        hostname = unit.get('hostname', 'Unknown')
-        logging.info(f"Checking IP: {ip_address} with hostname: {hostname}")
+def device_info_changed(device_info):
+    """
+    Records the latest device info for a charger.
+    Returns True if it differs from what was last reported for that IP.
+    """
+    state = get_unit_state(device_info['ip'])
+    if state['last_info'] == device_info:
+        return False
+    state['last_info'] = device_info
+    return True
 
-        login_url = f"https://{ip_address}{API_LOGIN_ENDPOINT}"
-        get_url = f"https://{ip_address}{API_GET_ENDPOINT}"
-        logging.info(f"Constructed login URL: {login_url}")
-        logging.info(f"Constructed get URL: {get_url}")
+def clear_reported_info():
+    """
+    Forgets the last reported info of every charger so the next poll reports all of them again.
+    """
+    for state in list(_UNIT_STATE.values()):
+        state['last_info'] = None
 
-        # Prepare the login request payload
-        login_payload = {
-            "version": 1,
-            "login": {
-                "username": USERNAME,
-                "password": PASSWORD
-            }
-        }
+def login_charger(session, ip_address):
+    """
+    Logs in to the charger and caches the returned token in its unit state.
+    Returns the token, or None if the login was rejected.
+    """
+    state = get_unit_state(ip_address)
+    state['token'] = None
 
-        headers = {
-            'Content-Type': 'application/json',
-            'User-Agent': 'Python-Requests'
-        }
+    login_url = f"https://{ip_address}{API_LOGIN_ENDPOINT}"
+    log.debug("Constructed login URL: %s", login_url)
 
-        try:
-            # Create a session to maintain cookies
-            session = requests.Session()
-            session.verify = False  # Suppress SSL warnings
-            session.headers.update(headers)
+    # Send POST request to login and get the token
+    log.debug("Sending POST request to login...")
+    response = session.post(login_url, data=LOGIN_BODY, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
 
-            # Send POST request to login and get the token
-            logging.info("Sending POST request to login...")
-            response = session.post(login_url, json=login_payload, timeout=30)
-            response.raise_for_status()
+    data = loads_json(response.content)
+    if 'login' in data and 'token' in data['login']:
+        token = data['login']['token']
+    else:
+        log.error("Login failed: %s", data.get('api_errors', 'Unknown error'))
+        return None
 
-            data = response.json()
-            if 'login' in data and 'token' in data['login']:
-                token = data['login']['token']
-            else:
-                logging.error(f"Login failed: {data.get('api_errors', 'Unknown error')}")
-                continue
+    log.debug("Received token: %s", token)
+
+    state['token'] = token
+    state['token_ts'] = time.monotonic()
+    return token
 
-            logging.info(f"Received token: {token}")
+def is_auth_error(exc):
+    """
+    Returns True if a request exception is an HTTP 401/403 response from the charger.
+    """
+    response = getattr(exc, 'response', None)
+    return response is not None and response.status_code in AUTH_ERROR_STATUSES
+
+def poll_unit(unit):
+    """
+    Retrieves the device information of a single Ray unit, logging in only when
+    no valid cached token is available or the charger rejects the cached one.
+    Returns a device_info dictionary, or None if the unit could not be queried.
+    """
+    ip_address = unit['ip']
+    hostname = unit.get('hostname', 'Unknown')
+    log.debug("Checking IP: %s with hostname: %s", ip_address, hostname)
+
+    state = get_unit_state(ip_address)
+
+    try:
+        # Reuse the persistent session for this charger to keep the connection alive
+        session = get_session(ip_address)
+
+        token_cached = state['token'] is not None and time.monotonic() - state['token_ts'] < TOKEN_TTL
+        token = state['token'] if token_cached else login_charger(session, ip_address)
+        if not token:
+            return None
 
-            # Use the session and token to fetch the required information
+        # Use the session and token to fetch the required information
+        try:
+            info = get_charger_info(session, ip_address, token)
+        except requests.exceptions.HTTPError as e:
+            if not (token_cached and is_auth_error(e)):
+                raise
+            # The cached token has been invalidated by the charger; log in again once
+            log.info("Cached token rejected by %s, logging in again.", ip_address)
+            token = login_charger(session, ip_address)
+            if not token:
+                return None
             info = get_charger_info(session, ip_address, token)
-            if info:
-                logging.info(f"Successfully retrieved charger info for {ip_address}.")
 
-                # Extract the desired information
-                device_info = extract_device_info(ip_address, hostname, info)
-                devices_info.append(device_info)
+        if info:
+            log.debug("Successfully retrieved charger info for %s.", ip_address)
 
-                logging.info(f"Retrieved info for device at IP: {ip_address}")
+            # Extract the desired information
+            device_info = extract_device_info(ip_address, hostname, info)
 
-            else:
-                logging.error("Failed to retrieve charger info.")
-                continue
+            log.debug("Retrieved info for device at IP: %s", ip_address)
+            return device_info
 
-        except requests.exceptions.RequestException as e:
-            logging.error(f"Error connecting to {login_url}: {str(e)}")
-            continue
+        state['token'] = None
+        log.error("Failed to retrieve charger info.")
+        return None
 
-    return devices_info
+    except (requests.exceptions.RequestException, ValueError) as e:
+        state['token'] = None
+        log.error("Error connecting to %s: %s", ip_address, e)
+        return None
+
+# Device info keys reported to the app, mapped to their field names in the charger's info/EVSE data
+# ('hostname_info' is set separately since it falls back to the scanned hostname)
+DEVICE_INFO_FIELDS = (
+    # Fields from 'info'
+    ('system_ip', 'System IP Address'),
+    ('system_temp', 'System Temperature'),
+    ('charger_vendor', 'Charger Vendor'),
+    ('charger_model', 'Charger Model'),
+    # Additional fields from 'evse_info'
+    ('ac_voltage', 'AC Voltage'),
+    ('status', 'Status'),
+    ('available_power', 'Available Power'),
+    ('current', 'Current'),
+    ('current_offered', 'Current Offered'),
+    ('energy', 'Energy'),
+    ('evse_connector_type', 'EVSE Connector Type'),
+    ('evse_pp_state', 'EVSE PP State'),
+)
 
 def extract_device_info(ip_address, hostname, info):
     """
     Extracts device information from the retrieved data.
+    Missing fields are reported as 'N/A', except the hostname, which falls back to the scanned one.
     """
-    # Fields from 'info'
-    system_ip = info.get('System IP Address', 'N/A')
-    hostname_info = info.get('Hostname', hostname)
-    system_temp = info.get('System Temperature', 'N/A')
-    charger_vendor = info.get('Charger Vendor', 'N/A')
-    charger_model = info.get('Charger Model', 'N/A')
-
-    # Additional fields from 'evse_info'
-    ac_voltage = info.get('AC Voltage', 'N/A')
-    status = info.get('Status', 'N/A')
-    available_power = info.get('Available Power', 'N/A')
-    current = info.get('Current', 'N/A')
-    current_offered = info.get('Current Offered', 'N/A')
-    energy = info.get('Energy', 'N/A')
-    evse_connector_type = info.get('EVSE Connector Type', 'N/A')
-    evse_pp_state = info.get('EVSE PP State', 'N/A')
-
-    # Compile results
-    device_info = {
-        "ip": ip_address,
-        "system_ip": system_ip,
-        "hostname_info": hostname_info,
-        "system_temp": system_temp,
-        "charger_vendor": charger_vendor,
-        "charger_model": charger_model,
-        "ac_voltage": ac_voltage,
-        "status": status,
-        "available_power": available_power,
-        "current": current,
-        "current_offered": current_offered,
-        "energy": energy,
-        "evse_connector_type": evse_connector_type,
-        "evse_pp_state": evse_pp_state,
-        "success": True
-    }
+    get = info.get
+    device_info = {key: get(field, 'N/A') for key, field in DEVICE_INFO_FIELDS}
+    device_info["ip"] = ip_address
+    device_info["hostname_info"] = get('Hostname', hostname)
+    device_info["success"] = True
 
     return device_info
 
 def get_charger_info(session, ip_address, token):
     """
     Retrieves charger information using the provided session and token.
+    Raises requests.exceptions.HTTPError if the charger rejects the token (401/403).
     """
     # Construct the API URL for fetching info
     api_get_url = f"https://{ip_address}{API_GET_ENDPOINT}"
@@ -253,23 +569,23 @@ def get_charger_info(session, ip_address, token):
     }
 
     try:
-        logging.info(f"Sending POST request to {api_get_url} to fetch charger info...")
+        log.debug("Sending POST request to %s to fetch charger info...", api_get_url)
         # Use the session to make the POST request
-        response = session.post(api_get_url, json=get_payload, timeout=30)
+        response = session.post(api_get_url, json=get_payload, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
-        data = response.json()
-        logging.debug(f"Get response data: {data}")
+        data = loads_json(response.content)
+        log.debug("Get response data: %s", data)
 
         # Check if 'settings' and 'info' are in the response
         settings = data.get('settings')
         if not settings or not isinstance(settings, dict):
-            logging.error("Settings not found or invalid in the response.")
-            logging.error(f"API Errors: {data.get('api_errors')}")
+            log.error("Settings not found or invalid in the response.")
+            log.error("API Errors: %s", data.get('api_errors'))
             return None
 
         info = settings.get('info', {})
         if not info:
-            logging.error("Info not found in the response.")
+            log.error("Info not found in the response.")
             return None
 
         # Extract 'EVSEs' data
@@ -279,7 +595,7 @@ def get_charger_info(session, ip_address, token):
         if evse_key:
             evse_info = evses[evse_key]
         else:
-            logging.error("No EVSE data found.")
+            log.error("No EVSE data found.")
             evse_info = {}
 
         # Combine 'info' and 'evse_info' into a single dictionary
@@ -287,96 +603,121 @@ def get_charger_info(session, ip_address, token):
 
         return combined_info
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Error fetching charger info: {str(e)}")
+    except (requests.exceptions.RequestException, ValueError) as e:
+        # Let authentication failures through so the caller can refresh its token
+        if is_auth_error(e):
+            raise
+        log.error("Error fetching charger info: %s", e)
         return None
 
 def configure_charger(option):
     """
     Configures the charger based on the provided option.
     """
-    logging.info(f"Configuring charger with option: {option}")
+    log.info("Configuring charger with option: %s", option)
     try:
         # Placeholder for actual configuration logic
         time.sleep(1)  # Simulate time taken to configure
-        logging.info("Charger configured successfully.")
+        log.info("Charger configured successfully.")
         return True
     except Exception as e:
-        logging.error(f"Error in configure_charger: {e}")
+        log.error("Error in configure_charger: %s", e)
         return False
 
+def random_string(alphabet, length):
+    """
+    Returns a cryptographically secure random string of the given length drawn from alphabet.
+    Bytes are read from os.urandom in bulk and mapped with rejection sampling, so every
+    character is equally likely.
+    """
+    # Largest multiple of len(alphabet) that fits in a byte; higher values would bias the modulo
+    limit = 256 - 256 % len(alphabet)
+    chars = []
+    while len(chars) < length:
+        for byte in os.urandom(2 * (length - len(chars))):
+            if byte < limit:
+                chars.append(alphabet[byte % len(alphabet)])
+                if len(chars) == length:
+                    break
+    return ''.join(chars)
+
 def allocate_id():
     """
     Allocates a unique ID to a charger unit.
     """
-    logging.info("Allocating ID to charger unit.")
+    log.info("Allocating ID to charger unit.")
     try:
-        unique_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
-        logging.info(f"Allocated ID: {unique_id}")
+        unique_id = random_string(string.ascii_uppercase + string.digits, 8)
+        log.info("Allocated ID: %s", unique_id)
         return unique_id
     except Exception as e:
-        logging.error(f"Error in allocate_id: {e}")
+        log.error("Error in allocate_id: %s", e)
         return None
 
 def generate_password(length=12):
     """
     Generates a secure random password.
     """
-    logging.info("Generating secure password.")
+    log.info("Generating secure password.")
     try:
         characters = string.ascii_letters + string.digits + string.punctuation
-        password = ''.join(random.choices(characters, k=length))
-        logging.info("Password generated successfully.")
+        password = random_string(characters, length)
+        log.info("Password generated successfully.")
         return password
     except Exception as e:
-        logging.error(f"Error in generate_password: {e}")
+        log.error("Error in generate_password: %s", e)
         return None
 
 def generate_label():
     """
     Generates a label for a charger unit.
     """
-    logging.info("Generating label for charger unit.")
+    log.info("Generating label for charger unit.")
     try:
         labels = ['Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon']
         label = random.choice(labels) + '-' + ''.join(random.choices(string.digits, k=3))
-        logging.info(f"Generated label: {label}")
+        log.info("Generated label: %s", label)
         return label
     except Exception as e:
-        logging.error(f"Error in generate_label: {e}")
+        log.error("Error in generate_label: %s", e)
         return None
 
+def update_unit(unit):
+    """
+    Runs the software update for a single charger unit.
+    """
+    # Placeholder for actual update logic
+    log.info("Updating unit: %s at %s", unit['hostname'], unit['ip'])
+    time.sleep(2)  # Simulate time taken to update
+
 def start_software_update():
     """
     Initiates a software update for all charger units.
     """
-    logging.info("Starting software update for all charger units.")
+    log.info("Starting software update for all charger units.")
     try:
         units = find_ray_units()
         if not units:
-            logging.warning("No Ray units found to update.")
+            log.warning("No Ray units found to update.")
             return False
 
-        for unit in units:
-            # Placeholder for actual update logic
-            logging.info(f"Updating unit: {unit['hostname']} at {unit['ip']}")
-            time.sleep(2)  # Simulate time taken to update
-        logging.info("Software update completed successfully.")
+        # Update all units concurrently; each update is independent and I/O bound
+        with ThreadPoolExecutor(max_workers=min(MAX_POLL_WORKERS, len(units))) as executor:
+            list(executor.map(update_unit, units))
+        log.info("Software update completed successfully.")
         return True
     except Exception as e:
-        logging.error(f"Error in start_software_update: {e}")
+        log.error("Error in start_software_update: %s", e)
         return False
 
 def process_known_ray_devices():
     """
     Processes the known Ray devices manually if not found via network scan.
+    All known devices are checked in a single call so they are polled concurrently.
+    Returns a list of device_info dictionaries.
     """
-    logging.info("Processing the known 'ray' devices manually.")
-    for ray_device in KNOWN_RAY_DEVICES:
-        ip_address = ray_device["ip"]
-        hostname = ray_device.get("hostname", "Unknown")
-        logging.info(f"Processing known Ray device - IP: {ip_address}, Hostname: {hostname}")
-        check_unit_ready([ray_device])
+    log.info("Processing the known 'ray' devices manually: %s", KNOWN_RAY_DEVICES)
+    return check_unit_ready(KNOWN_RAY_DEVICES)
 
 def start_charger_monitoring():
     """
@@ -385,46 +726,91 @@ def start_charger_monitoring():
     """
     def monitor():
         previous_units = set()
-
-        while True:
-            try:
-                ray_units = find_ray_units()
-                current_units = set(unit['ip'] for unit in ray_units)
-
-                # Detect removed chargers
-                removed_units = previous_units - current_units
-                for ip in removed_units:
-                    logging.info(f"Charger at IP {ip} removed.")
-                    # Emit JSON message
-                    message = {'event': 'charger_removed', 'ip': ip}
-                    print(json.dumps(message))
-                    sys.stdout.flush()
-
-                # Update the previous_units set
-                previous_units = current_units.copy()
-
-                if ray_units:
-                    devices_info = check_unit_ready(ray_units)
-                    # Emit JSON messages for each charger status update
-                    for device_info in devices_info:
-                        message = {'event': 'charger_status_update', 'data': device_info}
-                        print(json.dumps(message))
-                        sys.stdout.flush()
-                else:
-                    if KNOWN_RAY_DEVICES:
-                        logging.info("No 'ray' devices found via scan. Proceeding with known devices.")
-                        devices_info = check_unit_ready(KNOWN_RAY_DEVICES)
-                        for device_info in devices_info:
-                            message = {'event': 'charger_status_update', 'data': device_info}
-                            print(json.dumps(message))
-                            sys.stdout.flush()
+        ray_units = []
+
+        # Number of ticks since every charger's status was last sent in full
+        ticks_since_resend = 0
+
+        # Scans start on a fixed monotonic schedule so the period doesn't drift with scan duration
+        deadline = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=1) as scanner:
+            while True:
+                # Periodically resend every charger's status, even if unchanged, so the app
+                # recovers from a reload or a refresh that replaced its charger list
+                if ticks_since_resend >= FULL_RESEND_TICKS:
+                    clear_reported_info()
+                    ticks_since_resend = 0
+                ticks_since_resend += 1
+
+                # Messages collected during this scan, written out together at the end
+                messages = []
+
+                try:
+                    # Run the ARP scan in the background and poll the units found by the
+                    # previous scan (or the known devices) while waiting for replies
+                    scan = scanner.submit(find_ray_units)
+                    polled_units = ray_units or KNOWN_RAY_DEVICES
+                    devices_info = check_unit_ready(polled_units)
+
+                    ray_units = scan.result()
+                    current_units = set(unit['ip'] for unit in ray_units)
+
+                    for ip in current_units - previous_units:
+                        log.info("Charger at IP %s found.", ip)
+
+                    # Detect removed chargers
+                    removed_units = previous_units - current_units
+                    for ip in removed_units:
+                        log.info("Charger at IP %s removed.", ip)
+                        reset_unit_state(ip)
+                        messages.append({'event': 'charger_removed', 'ip': ip})
+
+                    # Update the previous_units set
+                    previous_units = current_units.copy()
+
+                    # Keep only the results for this scan's chargers, or for the known devices
+                    # when the scan found none, and poll any of those not polled yet this tick
+                    if ray_units:
+                        reported_units = ray_units
                     else:
-                        logging.error("No 'ray' devices found via scan and no known devices are specified.")
-                # Wait before the next scan
-                time.sleep(3)  # Adjust the interval as needed
-            except Exception as e:
-                logging.error(f"Error in charger monitoring: {e}")
-                time.sleep(3)  # Wait before retrying in case of error
+                        reported_units = KNOWN_RAY_DEVICES
+                        if KNOWN_RAY_DEVICES:
+                            log.debug("No 'ray' devices found via scan. Proceeding with known devices.")
+                        else:
+                            log.error("No 'ray' devices found via scan and no known devices are specified.")
+
+                    reported_ips = set(unit['ip'] for unit in reported_units)
+                    devices_info = [device_info for device_info in devices_info if device_info['ip'] in reported_ips]
+
+                    polled_ips = set(unit['ip'] for unit in polled_units)
+                    unpolled_units = [unit for unit in reported_units if unit['ip'] not in polled_ips]
+                    if unpolled_units:
+                        devices_info += check_unit_ready(unpolled_units)
+
+                    # A scanned charger that stopped answering may have left the network; rescan next tick
+                    responded_ips = set(device_info['ip'] for device_info in devices_info)
+                    if not current_units <= responded_ips:
+                        invalidate_arp_cache()
+
+                    # Queue JSON messages only for chargers whose status changed
+                    for device_info in devices_info:
+                        if device_info_changed(device_info):
+                            messages.append({'event': 'charger_status_update', 'data': device_info})
+                    deadline += MONITOR_INTERVAL
+                except Exception as e:
+                    log.error("Error in charger monitoring: %s", e)
+                    # Wait a full interval before retrying in case of error
+                    deadline = time.monotonic() + MONITOR_INTERVAL
+
+                emit_messages(messages)
+
+                # Wait until the next scan is due; if this one overran, skip the missed
+                # slots rather than running a burst of back-to-back scans
+                now = time.monotonic()
+                if deadline < now:
+                    deadline = now
+                time.sleep(deadline - now)
 
     # Start the monitoring loop
     monitor()
@@ -438,12 +824,13 @@ def main():
     parser.add_argument('--monitor', action='store_true', help='Start monitoring chargers continuously')
 
     args = parser.parse_args()
+    configure_logging(args.monitor)
 
     if args.monitor:
-        logging.info("Starting charger monitoring in continuous mode.")
+        log.info("Starting charger monitoring in continuous mode.")
         start_charger_monitoring()
     else:
-        logging.info("Running charger API in single-run mode.")
+        log.info("Running charger API in single-run mode.")
         # Find Ray units on the network
         ray_units = find_ray_units()
         devices_info = []
@@ -457,7 +844,7 @@ def main():
         else:
             # If no 'ray' devices found, process known devices
             if KNOWN_RAY_DEVICES:
-                logging.info("No 'ray' devices found via scan. Proceeding with known devices.")
+                log.info("No 'ray' devices found via scan. Proceeding with known devices.")
                 devices_info = check_unit_ready(KNOWN_RAY_DEVICES)
                 if devices_info:
                     # Print the collected device information
@@ -470,7 +857,7 @@ def main():
                 # If no known devices, print an error message
                 output = {"success": False, "message": "No devices found on the network.", "version": 2}
                 print(json.dumps(output, indent=2))
-                logging.error("No devices found on the network.")
+                log.error("No devices found on the network.")
 
 if __name__ == '__main__':
     main()